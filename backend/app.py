@@ -1,9 +1,31 @@
+import io
 import os
-import json
-from flask import Flask, request, jsonify
+import re
+import orjson
+import math
+import hashlib
+import time
+import uuid
+import threading
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from functools import lru_cache
+from flask import Flask, Response, request, jsonify
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
-from PyPDF2 import PdfReader
+from flask_compress import Compress
+import fitz  # PyMuPDF
+from pdf_pages import extract_pdf_pages
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+import diskcache
+import zstandard as zstd
+import numpy as np
+from rank_bm25 import BM25Okapi
+from a2wsgi import WSGIMiddleware
 
 # -------------------------------
 # SMART RESEARCH SUMMARIZER API
@@ -26,8 +48,27 @@ import google.generativeai as genai
 API_KEY = ""  # TODO: add your Gemini API key here
 genai.configure(api_key=API_KEY)
 
+# Shared Gemini model, created once rather than on every request
+MODEL = genai.GenerativeModel('gemini-2.0-flash')
+
+
+class ORJSONProvider(JSONProvider):
+    """
+    Flask JSON provider backed by orjson, which serializes several
+    times faster than the standard library json module.
+    """
+
+    def dumps(self, obj, **kwargs):
+        # OPT_NON_STR_KEYS allows dicts keyed by question index
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 # Initialize Flask app
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 # Enable CORS so frontend apps can connect without cross-origin errors
 CORS(app)
 
@@ -40,9 +81,86 @@ if not os.path.exists(UPLOAD_FOLDER):
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # Max upload = 16MB
 
+# Compress JSON responses (Brotli, falling back to gzip). Server-Sent Events
+# streams are not in the compressed mimetypes, so they still flush per chunk.
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_MIN_SIZE'] = 500  # bytes
+Compress(app)
+
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {'pdf', 'txt'}
 
+# Gemini context caching: each document is uploaded to Gemini once and
+# later prompts reference it by cache name instead of resending the text.
+# Caching requires an explicitly versioned model name.
+CACHE_MODEL = 'models/gemini-2.0-flash-001'
+CACHE_TTL = timedelta(hours=1)
+
+# Errors that mean a context cache is gone (expired or deleted), as opposed
+# to a transient failure. Only these trigger re-uploading the document.
+CACHE_MISS_ERRORS = (google_exceptions.NotFound, google_exceptions.PermissionDenied)
+
+# Longest time one request may hold the lock while recreating a context cache
+CACHE_REFRESH_LOCK_TIMEOUT = 120  # seconds
+
+# PDFs with more pages than this are extracted in parallel worker processes.
+# PyMuPDF extracts roughly 1,000+ pages/s on one core, so below a few
+# hundred pages the serial path finishes before parallelism pays off.
+PARALLEL_PDF_MIN_PAGES = 300
+
+# Directory for the on-disk document and answer stores. Keeping state on
+# disk rather than in process memory lets several server workers share it.
+DATA_FOLDER = 'doc_cache'
+
+# Documents estimated above this many tokens are summarized map-reduce style:
+# each chunk is summarized in parallel, then the partial summaries combined.
+# Tokens are estimated as characters / 4.
+MAP_REDUCE_MIN_TOKENS = 100_000
+SUMMARY_CHUNK_TOKENS = 6000
+SUMMARY_CHUNK_OVERLAP_TOKENS = 200
+SUMMARY_WORKERS = 8
+
+# Most concurrent Gemini calls /evaluate_challenge makes for answers the
+# batched evaluation didn't cover
+EVALUATION_WORKERS = 8
+
+# /ask retrieval: documents are indexed with BM25 over chunks of roughly
+# this many tokens, and questions are answered from the top matches only.
+RETRIEVAL_CHUNK_TOKENS = 500
+RETRIEVAL_TOP_K = 5
+
+# Semantic answer cache: a question whose embedding has at least this cosine
+# similarity to a previously answered one reuses that answer
+EMBEDDING_MODEL = 'models/text-embedding-004'
+SEMANTIC_CACHE_THRESHOLD = 0.92
+SEMANTIC_CACHE_PER_DOCUMENT = 64
+
+# Requests handled concurrently per server worker when served over ASGI
+ASGI_THREADS = 32
+
+# A pending upload older than this is treated as dead (e.g. its worker was
+# restarted): it is reported as failed, and identical content re-uploaded
+# after it starts a fresh job
+UPLOAD_JOB_TIMEOUT = timedelta(minutes=10)
+
+# Number of uploads extracted and summarized concurrently in the background
+UPLOAD_WORKERS = 4
+
+# Read buffer size used when extracting TXT files
+TXT_READ_BUFFER_SIZE = 1024 * 1024  # 1MB
+
+# Block size used when streaming uploads to disk
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+# How long an uploaded document stays available for questions
+DOCUMENT_TTL = timedelta(hours=24)
+
+# zstd compression level for stored document text
+TEXT_COMPRESSION_LEVEL = 3
+
+# Maximum size of the answer cache (least recently used answers are evicted)
+ANSWER_CACHE_SIZE_LIMIT = 64 * 1024 * 1024  # 64MB
+
 
 # -------------------------------
 # Helper Functions
@@ -61,29 +179,89 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+# Worker processes for parallel PDF extraction, created on first use
+pdf_executor = None
+pdf_executor_lock = threading.Lock()
+
+
+def get_pdf_executor():
+    """
+    Get the shared process pool used to extract large PDFs, creating it
+    the first time it is needed.
+
+    Workers are spawned rather than forked from the threaded server
+    process, and only need pdf_pages (PyMuPDF) to run.
+
+    Returns:
+        ProcessPoolExecutor: The shared pool.
+    """
+    global pdf_executor
+    with pdf_executor_lock:
+        if pdf_executor is None:
+            pdf_executor = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return pdf_executor
+
+
+def discard_pdf_executor(executor):
+    """
+    Drop a process pool that has become unusable (e.g. a worker crashed
+    on a malformed PDF or was killed), so the next call creates a new one.
+
+    Parameters:
+        executor (ProcessPoolExecutor): The broken pool.
+    """
+    global pdf_executor
+    with pdf_executor_lock:
+        if pdf_executor is executor:
+            pdf_executor = None
+    executor.shutdown(wait=False)
+
+
 def extract_text_from_pdf(pdf_path):
     """
     Extract text from a PDF file. Annotates each extracted line
     with page and line numbers for traceability.
 
+    Large PDFs are split into page ranges that are extracted in
+    parallel worker processes. If the worker pool breaks, it is replaced
+    and the extraction retried once.
+
     Parameters:
         pdf_path (str): Path to the PDF file.
 
     Returns:
         str or None: The extracted text, or None if error.
     """
-    text = ""
     try:
-        with open(pdf_path, 'rb') as file:
-            reader = PdfReader(file)
-            for page_num, page in enumerate(reader.pages):
-                page_text = page.extract_text() or ""
-                lines = page_text.split('\n')
-                for i, line in enumerate(lines):
-                    if line.strip():
-                        text += f"[Page {page_num + 1}, Line {i + 1}] {line}\n"
-                    else:
-                        text += "\n"
+        with fitz.open(pdf_path) as doc:
+            page_count = doc.page_count
+
+        workers = os.cpu_count() or 1
+        if page_count > PARALLEL_PDF_MIN_PAGES and workers > 1:
+            chunk_size = math.ceil(page_count / workers)
+            ranges = [
+                (start, min(start + chunk_size, page_count))
+                for start in range(0, page_count, chunk_size)
+            ]
+            for attempt in range(2):
+                executor = get_pdf_executor()
+                try:
+                    futures = [
+                        executor.submit(extract_pdf_pages, pdf_path, start, stop)
+                        for start, stop in ranges
+                    ]
+                    text = "".join(future.result() for future in futures)
+                    break
+                except BrokenProcessPool:
+                    discard_pdf_executor(executor)
+                    if attempt:
+                        raise
+                    print("PDF worker pool broke, retrying with a new one")
+        else:
+            text = extract_pdf_pages(pdf_path, 0, page_count)
         print(f"Extracted PDF text length: {len(text)}")
     except Exception as e:
         print(f"Error extracting text from PDF: {e}")
@@ -102,15 +280,19 @@ def extract_text_from_txt(txt_path):
     Returns:
         str or None: The extracted text, or None if error.
     """
-    text = ""
+    buffer = io.StringIO()
     try:
-        with open(txt_path, 'r', encoding='utf-8') as file:
-            lines = file.readlines()
-            for i, line in enumerate(lines):
-                if line.strip():
-                    text += f"[Line {i + 1}] {line}"
+        # Iterate the file lazily instead of loading every line with readlines()
+        with open(txt_path, 'r', encoding='utf-8', buffering=TXT_READ_BUFFER_SIZE) as file:
+            for i, line in enumerate(file, 1):
+                if not line.isspace():
+                    buffer.write('[Line ')
+                    buffer.write(str(i))
+                    buffer.write('] ')
+                    buffer.write(line)
                 else:
-                    text += "\n"
+                    buffer.write("\n")
+        text = buffer.getvalue()
         print(f"Extracted TXT text length: {len(text)}")
     except Exception as e:
         print(f"Error extracting text from TXT: {e}")
@@ -118,19 +300,62 @@ def extract_text_from_txt(txt_path):
     return text
 
 
-def get_gemini_response(prompt, generation_config=None):
+@lru_cache(maxsize=128)
+def get_cached_model(cached_content):
+    """
+    Build a Gemini model bound to a context cache.
+
+    Memoized per cache name, since from_cached_content fetches the cache's
+    metadata from the API each time it is called.
+
+    Parameters:
+        cached_content (str): Name of a Gemini context cache.
+
+    Returns:
+        genai.GenerativeModel: The model to call.
+    """
+    return genai.GenerativeModel.from_cached_content(cached_content=cached_content)
+
+
+def get_model(cached_content=None):
+    """
+    Get the Gemini model, bound to a context cache if one is given.
+
+    Parameters:
+        cached_content (str, optional): Name of a Gemini context cache.
+
+    Returns:
+        genai.GenerativeModel: The model to call.
+    """
+    if cached_content:
+        return get_cached_model(cached_content)
+    return MODEL
+
+
+def get_gemini_response(prompt, generation_config=None, cached_content=None, stream=False):
     """
     Send a prompt to Gemini AI and return the response text.
 
     Parameters:
         prompt (str): The prompt to send.
         generation_config (dict, optional): Any config for structured outputs.
+        cached_content (str, optional): Name of a Gemini context cache holding
+            the document. When given, the prompt is answered against it.
+        stream (bool, optional): Return the response incrementally.
 
     Returns:
-        str or None: The response text from Gemini AI.
+        str or None: The response text from Gemini AI. With stream=True, a
+        generator of text chunks instead, which raises if the call fails.
+
+    Raises:
+        CACHE_MISS_ERRORS: If cached_content no longer exists, so the caller
+        can recreate the cache. Other errors are logged and return None.
     """
+    if stream:
+        return stream_gemini_response(prompt, generation_config, cached_content)
+
     try:
-        model = genai.GenerativeModel('gemini-2.0-flash')
+        model = get_model(cached_content)
         if generation_config:
             response = model.generate_content(prompt, generation_config=generation_config)
         else:
@@ -139,14 +364,746 @@ def get_gemini_response(prompt, generation_config=None):
         if response.candidates and response.candidates[0].content.parts:
             return response.candidates[0].content.parts[0].text
         return None
+    except CACHE_MISS_ERRORS as e:
+        if cached_content:
+            raise
+        print(f"Error interacting with Gemini API: {e}")
+        return None
     except Exception as e:
         print(f"Error interacting with Gemini API: {e}")
         return None
 
 
-# Dictionary to store extracted document content
-# Key = filename, Value = extracted text
-document_content = {}
+def stream_gemini_response(prompt, generation_config=None, cached_content=None):
+    """
+    Send a prompt to Gemini AI and yield the response text as it arrives.
+
+    Parameters:
+        prompt (str): The prompt to send.
+        generation_config (dict, optional): Any config for structured outputs.
+        cached_content (str, optional): Name of a Gemini context cache.
+
+    Yields:
+        str: Chunks of the response text.
+
+    Raises:
+        Exception: Any error from Gemini, including one partway through the
+        response, so a cut-off answer isn't mistaken for a complete one.
+        CACHE_MISS_ERRORS means cached_content no longer exists.
+    """
+    model = get_model(cached_content)
+    response = model.generate_content(
+        prompt, generation_config=generation_config, stream=True
+    )
+    for chunk in response:
+        if chunk.candidates and chunk.candidates[0].content.parts:
+            yield chunk.candidates[0].content.parts[0].text
+
+
+def create_document_cache(text):
+    """
+    Upload document text to Gemini's context cache.
+
+    Parameters:
+        text (str): The extracted document text.
+
+    Returns:
+        str or None: The cache name, or None if caching failed
+        (e.g. the document is below Gemini's minimum cache size).
+    """
+    try:
+        cache = genai.caching.CachedContent.create(
+            model=CACHE_MODEL,
+            contents=[text],
+            ttl=CACHE_TTL
+        )
+        return cache.name
+    except Exception as e:
+        print(f"Error creating Gemini context cache: {e}")
+        return None
+
+
+def delete_document_cache(cache_name):
+    """
+    Delete a Gemini context cache that is no longer used.
+
+    Parameters:
+        cache_name (str): Name of the cache to delete.
+    """
+    try:
+        genai.caching.CachedContent.get(cache_name).delete()
+    except CACHE_MISS_ERRORS:
+        pass  # Already expired or deleted
+    except Exception as e:
+        print(f"Error deleting Gemini context cache: {e}")
+
+
+def compress_text(text):
+    """
+    Compress document text for storage.
+
+    Parameters:
+        text (str): The text to compress.
+
+    Returns:
+        bytes: zstd-compressed UTF-8 text.
+    """
+    return zstd.compress(text.encode('utf-8'), TEXT_COMPRESSION_LEVEL)
+
+
+def get_document_text(document):
+    """
+    Decompress the stored text of a document.
+
+    Parameters:
+        document (dict): Entry from document_content.
+
+    Returns:
+        str: The extracted document text.
+    """
+    return zstd.decompress(document['text']).decode('utf-8')
+
+
+def tokenize(text):
+    """
+    Split text into lowercase word tokens for BM25 indexing.
+
+    Parameters:
+        text (str): The text to tokenize.
+
+    Returns:
+        list[str]: The tokens.
+    """
+    return re.findall(r'\w+', text.lower())
+
+
+def build_retrieval_index(text):
+    """
+    Split a document into retrieval chunks and index them with BM25.
+
+    Parameters:
+        text (str): The extracted document text.
+
+    Returns:
+        tuple or None: (zstd-compressed JSON list of chunks, BM25Okapi index),
+        or None if the text has no words to index (e.g. a scanned PDF).
+    """
+    chunks = split_into_chunks(text, RETRIEVAL_CHUNK_TOKENS)
+    tokenized = [tokenize(chunk) for chunk in chunks]
+    if not any(tokenized):
+        return None
+    index = BM25Okapi(tokenized)
+    return zstd.compress(orjson.dumps(chunks), TEXT_COMPRESSION_LEVEL), index
+
+
+def retrieve_chunks(document, query):
+    """
+    Find the chunks of a document most relevant to a question.
+
+    Parameters:
+        document (dict): Entry from document_content.
+        query (str): The user's question.
+
+    Returns:
+        list[str] or None: The top RETRIEVAL_TOP_K chunks in document
+        order, or None if the whole document should be used instead
+        (it is small, or no chunk matches any term of the question).
+    """
+    entry = retrieval_indexes.get(document['hash'])
+    if entry is None:
+        return None
+    compressed_chunks, index = entry
+    if index.corpus_size <= RETRIEVAL_TOP_K:
+        return None
+
+    scores = index.get_scores(tokenize(query))
+    if scores.max() <= 0:
+        return None
+    top = np.argsort(scores)[::-1][:RETRIEVAL_TOP_K]
+    chunks = orjson.loads(zstd.decompress(compressed_chunks))
+    return [chunks[i] for i in sorted(top)]
+
+
+def refresh_document_cache(document, stale_cache):
+    """
+    Recreate a document's Gemini context cache after it expired, delete
+    the superseded cache and save the new cache name to the document store.
+
+    Refreshes are serialized per document across threads and workers; if
+    another request already replaced stale_cache, its cache is reused.
+
+    Parameters:
+        document (dict): Entry from document_content.
+        stale_cache (str): Name of the cache that was found missing.
+
+    Returns:
+        str or None: The new cache name.
+    """
+    lock_key = ('refresh', document['hash'])
+    with diskcache.Lock(document_content, lock_key, expire=CACHE_REFRESH_LOCK_TIMEOUT):
+        stored = document_content.get(document['hash'])
+        if stored and stored.get('cache') and stored['cache'] != stale_cache:
+            document['cache'] = stored['cache']
+            return document['cache']
+
+        document['cache'] = create_document_cache(get_document_text(document))
+        if stored:
+            stored['cache'] = document['cache']
+            document_content.set(document['hash'], stored, expire=DOCUMENT_TTL.total_seconds())
+        delete_document_cache(stale_cache)
+        return document['cache']
+
+
+def ask_about_document(document, instruction, generation_config=None):
+    """
+    Run an instruction against a stored document.
+
+    Uses the document's Gemini context cache when one exists. If Gemini
+    reports the cache missing (its TTL expired), the cache is recreated
+    once and the call retried. Documents without a cache fall back to
+    sending the full text inline.
+
+    Parameters:
+        document (dict): Entry from document_content.
+        instruction (str): The prompt, phrased in terms of "the document".
+        generation_config (dict, optional): Any config for structured outputs.
+
+    Returns:
+        str or None: The response text from Gemini AI.
+    """
+    if document.get('cache'):
+        stale_cache = document['cache']
+        try:
+            return get_gemini_response(
+                instruction, generation_config, cached_content=stale_cache
+            )
+        except CACHE_MISS_ERRORS as e:
+            print(f"Gemini context cache unavailable, recreating it: {e}")
+
+        if refresh_document_cache(document, stale_cache):
+            try:
+                return get_gemini_response(
+                    instruction, generation_config, cached_content=document['cache']
+                )
+            except CACHE_MISS_ERRORS as e:
+                print(f"Error interacting with Gemini API: {e}")
+                return None
+
+    prompt = f"{instruction}\n\nDocument content: {get_document_text(document)}"
+    return get_gemini_response(prompt, generation_config)
+
+
+def stream_about_document(document, instruction):
+    """
+    Streaming counterpart of ask_about_document().
+
+    Parameters:
+        document (dict): Entry from document_content.
+        instruction (str): The prompt, phrased in terms of "the document".
+
+    Yields:
+        str: Chunks of the response text.
+
+    Raises:
+        Exception: If the response fails, as in stream_gemini_response().
+    """
+    if document.get('cache'):
+        stale_cache = document['cache']
+        produced = False
+        try:
+            for chunk in get_gemini_response(instruction, cached_content=stale_cache, stream=True):
+                produced = True
+                yield chunk
+            return
+        except CACHE_MISS_ERRORS as e:
+            if produced:
+                # Part of the answer is already out; don't restart it
+                raise
+            print(f"Gemini context cache unavailable, recreating it: {e}")
+
+        if refresh_document_cache(document, stale_cache):
+            yield from get_gemini_response(instruction, cached_content=document['cache'], stream=True)
+            return
+
+    prompt = f"{instruction}\n\nDocument content: {get_document_text(document)}"
+    yield from get_gemini_response(prompt, stream=True)
+
+
+def wants_event_stream():
+    """
+    Check whether the client asked for a streamed (Server-Sent Events) response.
+
+    Returns:
+        bool: True if the request prefers text/event-stream over JSON.
+    """
+    best = request.accept_mimetypes.best_match(['application/json', 'text/event-stream'])
+    return best == 'text/event-stream'
+
+
+def event_stream(chunks, error_message, on_complete=None):
+    """
+    Wrap text chunks as a Server-Sent Events response.
+
+    Each chunk is sent as `data: {"text": ...}`. If no text is produced, or
+    the chunks raise partway through, a `data: {"error": ...}` event is sent
+    and the text is treated as incomplete.
+
+    Parameters:
+        chunks (iterable): Text chunks to send.
+        error_message (str): Error to report if the text is missing or incomplete.
+        on_complete (callable, optional): Called with the full text once
+            streaming finishes successfully.
+
+    Returns:
+        flask.Response: A text/event-stream response.
+    """
+    def generate():
+        parts = []
+        try:
+            for chunk in chunks:
+                parts.append(chunk)
+                yield f"data: {orjson.dumps({'text': chunk}).decode('utf-8')}\n\n"
+        except Exception as e:
+            print(f"Error streaming from Gemini API: {e}")
+            yield f"data: {orjson.dumps({'error': error_message}).decode('utf-8')}\n\n"
+            return
+        if not parts:
+            yield f"data: {orjson.dumps({'error': error_message}).decode('utf-8')}\n\n"
+        elif on_complete:
+            on_complete("".join(parts))
+
+    return Response(generate(), mimetype='text/event-stream')
+
+
+def split_into_chunks(text, max_tokens, overlap_tokens=0):
+    """
+    Split text into windows of roughly max_tokens tokens (estimated as
+    characters / 4). Splits fall on line boundaries so [Page X, Line Y]
+    markers stay intact, and each window repeats about overlap_tokens of
+    the previous one's trailing lines for context.
+
+    Parameters:
+        text (str): The text to split.
+        max_tokens (int): Approximate token budget per chunk.
+        overlap_tokens (int, optional): Approximate tokens shared between
+            consecutive chunks.
+
+    Returns:
+        list[str]: The chunks, in document order.
+    """
+    max_chars = max_tokens * 4
+    overlap_chars = overlap_tokens * 4
+    chunks = []
+    current = []
+    current_len = 0
+    for line in text.splitlines(keepends=True):
+        if current and current_len + len(line) > max_chars:
+            chunks.append("".join(current))
+            # Carry trailing lines over into the next chunk
+            overlap = []
+            overlap_len = 0
+            for previous in reversed(current):
+                if overlap_len + len(previous) > overlap_chars:
+                    break
+                overlap.insert(0, previous)
+                overlap_len += len(previous)
+            current = overlap
+            current_len = overlap_len
+        current.append(line)
+        current_len += len(line)
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+def summarize_document(document, text):
+    """
+    Summarize a document in no more than 150 words.
+
+    Documents above MAP_REDUCE_MIN_TOKENS are split into chunks that are
+    summarized in parallel, and the partial summaries are then combined
+    into one. Smaller documents are summarized in a single call.
+
+    Parameters:
+        document (dict): Entry from document_content.
+        text (str): The document's extracted text.
+
+    Returns:
+        str or None: The summary text.
+    """
+    if len(text) // 4 <= MAP_REDUCE_MIN_TOKENS:
+        return ask_about_document(
+            document,
+            "Summarize the document in no more than 150 words. "
+            "Focus on the main points."
+        )
+
+    chunks = split_into_chunks(text, SUMMARY_CHUNK_TOKENS, SUMMARY_CHUNK_OVERLAP_TOKENS)
+    with ThreadPoolExecutor(max_workers=SUMMARY_WORKERS) as executor:
+        partials = list(executor.map(
+            lambda chunk: get_gemini_response(
+                f"Summarize the following part of a document in no more than 150 words. "
+                f"Focus on the main points. Document part: {chunk}"
+            ),
+            chunks
+        ))
+
+    partials = [partial for partial in partials if partial]
+    if not partials:
+        return None
+    return get_gemini_response(
+        "The following are summaries of consecutive parts of one document. "
+        "Combine them into a single summary of the whole document in no more "
+        "than 150 words. Focus on the main points.\n\n"
+        "Part summaries:\n" + "\n\n".join(partials)
+    )
+
+
+def evaluate_answer(document, question, user_answer):
+    """
+    Ask Gemini to evaluate a single answer to a challenge question.
+
+    Parameters:
+        document (dict): Entry from document_content.
+        question (str): The challenge question.
+        user_answer (str): The user's answer.
+
+    Returns:
+        str or None: The verdict and justification text.
+    """
+    instruction = (
+        f"Based on the document, evaluate if this answer: '{user_answer}' "
+        f"is correct for the question: '{question}'. Give a verdict "
+        f"(Correct/Partially Correct/Incorrect) and justify using [Page X, Line Y] or [Line Y] markers."
+    )
+    return ask_about_document(document, instruction)
+
+
+# Shared store for extracted document content, keyed by the uploaded
+# file's content hash so identical uploads share one entry.
+# Key = content hash, Value = {'hash': content hash, 'text': zstd-compressed text,
+#                              'cache': Gemini cache name or None,
+#                              'summary': summary text once generated}
+document_content = diskcache.Cache(os.path.join(DATA_FOLDER, 'documents'))
+
+# BM25 retrieval data for /ask, kept apart from document_content so other
+# routes don't load it.
+# Key = content hash, Value = (zstd-compressed JSON list of chunks, BM25Okapi)
+retrieval_indexes = diskcache.Cache(os.path.join(DATA_FOLDER, 'retrieval'))
+
+# Maps each uploaded filename to the content hash of its latest upload
+# Key = filename, Value = content hash
+document_hashes = diskcache.Cache(os.path.join(DATA_FOLDER, 'filenames'))
+
+# Shared cache of Gemini answers so repeated questions skip the API call.
+# Key = (content hash, blake2b digest of the normalized request), Value = answer.
+# Re-uploading changed content produces a new hash, so stale answers are
+# never served.
+answer_cache = diskcache.Cache(
+    os.path.join(DATA_FOLDER, 'answers'),
+    size_limit=ANSWER_CACHE_SIZE_LIMIT,
+    eviction_policy='least-recently-used'
+)
+
+# Embeddings of answered questions, for near-duplicate question lookups.
+# Key = content hash, Value = list of (unit-length float32 embedding, answer),
+#       least recently used first
+semantic_cache = diskcache.Cache(os.path.join(DATA_FOLDER, 'semantic'))
+
+# Status of background upload processing, shared across workers.
+# Key = upload id, Value = {'status': 'pending' | 'done' | 'error', ...}
+#     while pending also {'started': timestamp, 'filenames': [...]}
+# Key = ('hash', content hash), Value = {'job': id of the upload processing
+#                                         that content, 'started': timestamp}
+upload_jobs = diskcache.Cache(os.path.join(DATA_FOLDER, 'jobs'))
+
+# Background workers that extract and summarize uploaded documents
+upload_executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS)
+
+
+def get_document(document_name):
+    """
+    Look up the stored content of the latest upload of a filename.
+
+    Parameters:
+        document_name (str): The document's filename.
+
+    Returns:
+        dict or None: Entry from document_content, or None if not found.
+    """
+    content_hash = document_hashes.get(document_name)
+    if not content_hash:
+        return None
+    return document_content.get(content_hash)
+
+
+def answer_cache_key(document_hash, text):
+    """
+    Build an answer cache key for a request against a document.
+
+    Parameters:
+        document_hash (str): The document's content hash.
+        text (str): The request text (e.g. the question).
+
+    Returns:
+        tuple: (document_hash, digest) where digest hashes the document
+        hash and the whitespace-stripped, lowercased text.
+    """
+    normalized = text.strip().lower()
+    digest = hashlib.blake2b(f"{document_hash}\0{normalized}".encode('utf-8')).digest()
+    return (document_hash, digest)
+
+
+def get_cached_answer(key):
+    """
+    Look up an answer in the answer cache.
+
+    Parameters:
+        key (tuple): Key from answer_cache_key().
+
+    Returns:
+        The cached answer, or None on a miss.
+    """
+    return answer_cache.get(key)
+
+
+def store_cached_answer(key, answer):
+    """
+    Store an answer in the answer cache.
+
+    Parameters:
+        key (tuple): Key from answer_cache_key().
+        answer: The value to cache.
+    """
+    answer_cache.set(key, answer)
+
+
+def embed_query(query):
+    """
+    Embed a question for semantic cache lookups.
+
+    Parameters:
+        query (str): The user's question.
+
+    Returns:
+        np.ndarray or None: Unit-length float32 embedding, or None if the
+        embedding call failed.
+    """
+    try:
+        result = genai.embed_content(
+            model=EMBEDDING_MODEL,
+            content=query.strip(),
+            task_type='semantic_similarity'
+        )
+        embedding = np.asarray(result['embedding'], dtype=np.float32)
+        return embedding / np.linalg.norm(embedding)
+    except Exception as e:
+        print(f"Error embedding query: {e}")
+        return None
+
+
+def get_semantic_answer(document_hash, embedding):
+    """
+    Find a cached answer to a question similar to the given one.
+
+    Parameters:
+        document_hash (str): The document's content hash.
+        embedding (np.ndarray): Unit-length embedding of the question.
+
+    Returns:
+        str or None: The answer of the most similar cached question if it
+        reaches SEMANTIC_CACHE_THRESHOLD, otherwise None.
+    """
+    with semantic_cache.transact():
+        entries = semantic_cache.get(document_hash)
+        if not entries:
+            return None
+
+        # Embeddings are unit length, so the dot product is cosine similarity
+        similarities = np.stack([entry[0] for entry in entries]) @ embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] < SEMANTIC_CACHE_THRESHOLD:
+            return None
+
+        # Mark the hit as most recently used
+        entries.append(entries.pop(best))
+        semantic_cache.set(document_hash, entries, expire=DOCUMENT_TTL.total_seconds())
+        return entries[-1][1]
+
+
+def store_semantic_answer(document_hash, embedding, answer):
+    """
+    Add an answered question to the semantic cache, evicting the least
+    recently used entry once the document has SEMANTIC_CACHE_PER_DOCUMENT.
+
+    Parameters:
+        document_hash (str): The document's content hash.
+        embedding (np.ndarray): Unit-length embedding of the question.
+        answer (str): The answer to cache.
+    """
+    with semantic_cache.transact():
+        entries = semantic_cache.get(document_hash, [])
+        entries.append((embedding, answer))
+        semantic_cache.set(
+            document_hash,
+            entries[-SEMANTIC_CACHE_PER_DOCUMENT:],
+            expire=DOCUMENT_TTL.total_seconds()
+        )
+
+
+def save_upload(file, filename):
+    """
+    Stream an uploaded file to disk in 1MB blocks while hashing it.
+
+    The file is written to a temporary path, then moved to a path named
+    after its content hash (uploads/<hash>.<ext>). Uploads that share a
+    filename therefore never overwrite each other while they wait to be
+    processed, and a document is never read half-written.
+
+    Parameters:
+        file (FileStorage): The uploaded file.
+        filename (str): The uploaded file's name (for its extension).
+
+    Returns:
+        tuple: (hex blake2b digest of the contents, path of the saved file).
+    """
+    content_hash = hashlib.blake2b(digest_size=16)
+    with tempfile.NamedTemporaryFile(dir=app.config['UPLOAD_FOLDER'], delete=False) as out:
+        while chunk := file.stream.read(UPLOAD_CHUNK_SIZE):
+            content_hash.update(chunk)
+            out.write(chunk)
+
+    content_hash = content_hash.hexdigest()
+    extension = filename.rsplit('.', 1)[1].lower()
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{content_hash}.{extension}")
+    os.replace(out.name, filepath)
+    return content_hash, filepath
+
+
+def job_timed_out(started):
+    """
+    Check whether a pending upload has run past UPLOAD_JOB_TIMEOUT.
+
+    Parameters:
+        started (float): The job's start time (time.time()).
+
+    Returns:
+        bool: True if the job should be considered dead.
+    """
+    return time.time() - started > UPLOAD_JOB_TIMEOUT.total_seconds()
+
+
+def claim_upload(content_hash, filename):
+    """
+    Find or start the background job for an upload's content.
+
+    If identical content is already being processed (e.g. the same file
+    uploaded from two tabs), the upload follows that job: its filename is
+    pointed at the document when the job succeeds. Otherwise, or if
+    the earlier job failed or ran past UPLOAD_JOB_TIMEOUT, a new job is
+    created and claims the content.
+
+    Parameters:
+        content_hash (str): Hash of the uploaded file.
+        filename (str): The uploaded file's name.
+
+    Returns:
+        tuple: (job id, True if a new job must be started).
+    """
+    claim_key = ('hash', content_hash)
+    expire = DOCUMENT_TTL.total_seconds()
+    with upload_jobs.transact():
+        claim = upload_jobs.get(claim_key)
+        if claim:
+            job = upload_jobs.get(claim['job'])
+            if job and job['status'] == 'pending' and not job_timed_out(job['started']):
+                job['filenames'].append(filename)
+                upload_jobs.set(claim['job'], job, expire=expire)
+                return claim['job'], False
+            if job and job['status'] == 'done':
+                document_hashes.set(filename, content_hash, expire=expire)
+                return claim['job'], False
+
+        job_id = uuid.uuid4().hex
+        started = time.time()
+        upload_jobs.set(
+            job_id,
+            {'status': 'pending', 'started': started, 'filenames': [filename]},
+            expire=expire
+        )
+        upload_jobs.set(claim_key, {'job': job_id, 'started': started}, expire=expire)
+        return job_id, True
+
+
+def process_document(job_id, filepath, filename, content_hash):
+    """
+    Extract, store and summarize an uploaded document. Runs on
+    upload_executor; the outcome is recorded in upload_jobs[job_id].
+
+    Parameters:
+        job_id (str): The upload id returned by POST /upload.
+        filepath (str): Path of the saved upload.
+        filename (str): The document's filename.
+        content_hash (str): Hash of the uploaded file from save_upload().
+    """
+    def finish(result):
+        with upload_jobs.transact():
+            upload_jobs.set(job_id, result, expire=DOCUMENT_TTL.total_seconds())
+            claim = upload_jobs.get(('hash', content_hash))
+            if result['status'] == 'error' and claim and claim['job'] == job_id:
+                # Let a later upload of the same content try again
+                upload_jobs.delete(('hash', content_hash))
+
+    try:
+        # Extract text based on file type
+        extracted_text = None
+        if filename.lower().endswith('.pdf'):
+            extracted_text = extract_text_from_pdf(filepath)
+        elif filename.lower().endswith('.txt'):
+            extracted_text = extract_text_from_txt(filepath)
+
+        if not extracted_text:
+            finish({'status': 'error', 'error': 'Failed to extract text from document'})
+            return
+
+        # Save extracted text with its retrieval index, and upload the
+        # text to Gemini's context cache
+        # Without an index, /ask falls back to the full document
+        retrieval_index = build_retrieval_index(extracted_text)
+        if retrieval_index:
+            retrieval_indexes.set(content_hash, retrieval_index, expire=DOCUMENT_TTL.total_seconds())
+        document = {
+            'hash': content_hash,
+            'text': compress_text(extracted_text),
+            'cache': create_document_cache(extracted_text),
+            'summary': None
+        }
+        document_content.set(content_hash, document, expire=DOCUMENT_TTL.total_seconds())
+
+        # Generate summary from Gemini
+        summary = summarize_document(document, extracted_text)
+
+        if summary:
+            # Keep the summary so identical re-uploads can skip all of this
+            document['summary'] = summary
+            document_content.set(content_hash, document, expire=DOCUMENT_TTL.total_seconds())
+
+            # Only now point every filename uploaded with this content at
+            # it, so a failed re-upload leaves the previous version usable
+            with upload_jobs.transact():
+                job = upload_jobs.get(job_id)
+                for name in (job or {}).get('filenames', [filename]):
+                    document_hashes.set(name, content_hash, expire=DOCUMENT_TTL.total_seconds())
+                finish({
+                    'status': 'done',
+                    'message': 'File uploaded and summarized successfully',
+                    'summary': summary
+                })
+        else:
+            finish({'status': 'error', 'error': 'Failed to generate summary'})
+    except Exception as e:
+        print(f"Error processing document {filename}: {e}")
+        finish({'status': 'error', 'error': 'Failed to process document'})
 
 
 # -------------------------------
@@ -161,17 +1118,25 @@ def upload_document():
     Uploads a document (PDF or TXT) to the server.
 
     Steps:
-    - Save uploaded file to disk.
-    - Extract its text content.
-    - Send text to Gemini AI for summarization.
-    - Return JSON with summary.
+    - Stream uploaded file to disk under its content hash.
+    - If identical content was already processed, return its summary.
+    - If identical content is being processed, return that upload's id.
+    - Otherwise start extraction and summarization in the background.
+    - Return JSON with an upload id to poll via GET /status/<id>.
 
     Request:
         Form-data:
             file: (binary file) PDF or TXT
 
-    Response:
+    Response (202):
+        {
+            "message": "File uploaded, processing started",
+            "id": "...upload id..."
+        }
+
+    Response (200, identical content already processed):
         {
+            "status": "done",
             "message": "File uploaded and summarized successfully",
             "summary": "...summary text..."
         }
@@ -185,40 +1150,55 @@ def upload_document():
 
     if file and allowed_file(file.filename):
         filename = file.filename
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-
-        # Extract text based on file type
-        extracted_text = None
-        if filename.lower().endswith('.pdf'):
-            extracted_text = extract_text_from_pdf(filepath)
-        elif filename.lower().endswith('.txt'):
-            extracted_text = extract_text_from_txt(filepath)
-
-        if not extracted_text:
-            return jsonify({'error': 'Failed to extract text from document'}), 500
-
-        # Save extracted text in memory
-        document_content[filename] = extracted_text
+        content_hash, filepath = save_upload(file, filename)
 
-        # Generate summary from Gemini
-        summary_prompt = (
-            f"Summarize the following document in no more than 150 words. "
-            f"Focus on the main points. Document content: {extracted_text}"
-        )
-        summary = get_gemini_response(summary_prompt)
-
-        if summary:
+        # Identical content was already processed: skip extraction and summary
+        document = document_content.get(content_hash)
+        if document and document.get('summary'):
+            document_hashes.set(filename, content_hash, expire=DOCUMENT_TTL.total_seconds())
             return jsonify({
+                'status': 'done',
                 'message': 'File uploaded and summarized successfully',
-                'summary': summary
+                'summary': document['summary']
             }), 200
-        else:
-            return jsonify({'error': 'Failed to generate summary'}), 500
+
+        job_id, is_new_job = claim_upload(content_hash, filename)
+        if is_new_job:
+            upload_executor.submit(process_document, job_id, filepath, filename, content_hash)
+
+        return jsonify({
+            'message': 'File uploaded, processing started',
+            'id': job_id
+        }), 202
     else:
         return jsonify({'error': 'File type not allowed'}), 400
 
 
+@app.route('/status/<job_id>', methods=['GET'])
+def get_upload_status(job_id):
+    """
+    GET /status/<id>
+
+    Reports the progress of an upload started with POST /upload.
+
+    Response:
+        {"status": "pending"}
+        {"status": "done", "message": "...", "summary": "...summary text..."}
+        {"status": "error", "error": "..."}  (500)
+    """
+    job = upload_jobs.get(job_id)
+    if not job:
+        return jsonify({'error': 'Upload not found.'}), 404
+
+    if job['status'] == 'pending':
+        if job_timed_out(job['started']):
+            return jsonify({'status': 'error', 'error': 'Processing the document timed out'}), 500
+        return jsonify({'status': 'pending'}), 200
+    if job['status'] == 'error':
+        return jsonify(job), 500
+    return jsonify(job), 200
+
+
 @app.route('/ask', methods=['POST'])
 def ask_question():
     """
@@ -228,7 +1208,10 @@ def ask_question():
 
     Steps:
     - Accepts question and document name.
-    - Sends prompt to Gemini AI to answer using document content.
+    - Returns a cached answer if the same or a very similar question was
+      already answered.
+    - Retrieves the document passages most relevant to the question (BM25).
+    - Sends prompt to Gemini AI to answer using those passages.
     - Returns answer with references to document lines.
 
     Request:
@@ -241,6 +1224,9 @@ def ask_question():
         {
             "answer": "..."
         }
+
+        With "Accept: text/event-stream", the answer is streamed instead
+        as Server-Sent Events: data: {"text": "...chunk..."}
     """
     data = request.get_json()
     query = data.get('query')
@@ -249,20 +1235,62 @@ def ask_question():
     if not query or not document_name:
         return jsonify({'error': 'Missing query or document name'}), 400
 
-    doc_text = document_content.get(document_name)
-    if not doc_text:
+    document = get_document(document_name)
+    if not document:
         return jsonify({
             'error': 'Document content not found. Please upload the document again.'
         }), 404
 
-    prompt = (
-        f"Based on the following document, answer the question: '{query}'. "
-        f"Provide justification using [Page X, Line Y] or [Line Y] markers.\n\n"
-        f"Document content: {doc_text}"
-    )
-    answer = get_gemini_response(prompt)
+    cache_key = answer_cache_key(document['hash'], query)
+    answer = get_cached_answer(cache_key)
+
+    # Fall back to a previously answered question with the same meaning
+    query_embedding = None
+    if not answer:
+        query_embedding = embed_query(query)
+        if query_embedding is not None:
+            answer = get_semantic_answer(document['hash'], query_embedding)
 
     if answer:
+        if wants_event_stream():
+            return event_stream([answer], 'Failed to get an answer from the assistant')
+        return jsonify({'answer': answer}), 200
+
+    def remember_answer(answer):
+        store_cached_answer(cache_key, answer)
+        if query_embedding is not None:
+            store_semantic_answer(document['hash'], query_embedding, answer)
+
+    excerpts = retrieve_chunks(document, query)
+    if excerpts:
+        # Large document: answer from the most relevant passages only
+        prompt = (
+            f"Based on the following excerpts from a document, answer the question: '{query}'. "
+            f"Provide justification using [Page X, Line Y] or [Line Y] markers.\n\n"
+            "Document excerpts:\n" + "\n...\n".join(excerpts)
+        )
+        if wants_event_stream():
+            return event_stream(
+                get_gemini_response(prompt, stream=True),
+                'Failed to get an answer from the assistant',
+                on_complete=remember_answer
+            )
+        answer = get_gemini_response(prompt)
+    else:
+        instruction = (
+            f"Based on the document, answer the question: '{query}'. "
+            f"Provide justification using [Page X, Line Y] or [Line Y] markers."
+        )
+        if wants_event_stream():
+            return event_stream(
+                stream_about_document(document, instruction),
+                'Failed to get an answer from the assistant',
+                on_complete=remember_answer
+            )
+        answer = ask_about_document(document, instruction)
+
+    if answer:
+        remember_answer(answer)
         return jsonify({'answer': answer}), 200
     else:
         return jsonify({'error': 'Failed to get an answer from the assistant'}), 500
@@ -301,14 +1329,14 @@ def generate_challenge_questions():
     if not document_name:
         return jsonify({'error': 'Missing document name'}), 400
 
-    doc_text = document_content.get(document_name)
-    if not doc_text:
+    document = get_document(document_name)
+    if not document:
         return jsonify({'error': 'Document content not found.'}), 404
 
-    prompt = (
+    instruction = (
         f"Generate three distinct logic-based or comprehension-focused questions "
-        f"based on the following document. Provide them as a JSON array: "
-        f"[\"Q1\", \"Q2\", \"Q3\"]\n\nDocument content: {doc_text}"
+        f"based on the document. Provide them as a JSON array: "
+        f"[\"Q1\", \"Q2\", \"Q3\"]"
     )
 
     # Tell Gemini to respond in JSON
@@ -320,13 +1348,13 @@ def generate_challenge_questions():
         }
     }
 
-    questions_json_str = get_gemini_response(prompt, generation_config=generation_config)
+    questions_json_str = ask_about_document(document, instruction, generation_config=generation_config)
 
     if questions_json_str:
         try:
-            questions = json.loads(questions_json_str)
+            questions = orjson.loads(questions_json_str)
             return jsonify({'questions': questions}), 200
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             print(f"Failed to parse JSON from LLM: {questions_json_str}")
             return jsonify({'error': 'Invalid JSON from assistant'}), 500
     else:
@@ -342,7 +1370,7 @@ def evaluate_challenge_answers():
 
     Steps:
     - Accepts document name, questions, and user answers.
-    - Prompts Gemini to check if each answer is correct and provide justification.
+    - Prompts Gemini once to check every answer and provide justifications.
     - Returns feedback for each question.
 
     Request:
@@ -373,25 +1401,93 @@ def evaluate_challenge_answers():
     if not document_name or not questions or not user_answers:
         return jsonify({'error': 'Missing data'}), 400
 
-    doc_text = document_content.get(document_name)
-    if not doc_text:
+    document = get_document(document_name)
+    if not document:
         return jsonify({'error': 'Document content not found.'}), 404
 
+    cache_key = answer_cache_key(
+        document['hash'], orjson.dumps([questions, user_answers], option=orjson.OPT_SORT_KEYS).decode('utf-8')
+    )
+    feedback = get_cached_answer(cache_key)
+    if feedback:
+        return jsonify({'feedback': feedback}), 200
+
+    qa_pairs = [
+        {"question": question, "answer": user_answers.get(str(index), '')}
+        for index, question in enumerate(questions)
+    ]
+    instruction = (
+        f"Based on the document, evaluate each answer below against its question. "
+        f"For each pair, in the same order, give a verdict "
+        f"(Correct/Partially Correct/Incorrect) and a justification using "
+        f"[Page X, Line Y] or [Line Y] markers. Respond as a JSON array of "
+        f"{{\"verdict\", \"justification\"}} objects.\n\n"
+        f"Question/answer pairs: {orjson.dumps(qa_pairs).decode('utf-8')}"
+    )
+
+    # Tell Gemini to respond with one verdict object per question
+    generation_config = {
+        "response_mime_type": "application/json",
+        "response_schema": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "verdict": {"type": "STRING"},
+                    "justification": {"type": "STRING"}
+                }
+            }
+        }
+    }
+
+    evaluations_json_str = ask_about_document(document, instruction, generation_config=generation_config)
+
+    evaluations = []
+    if evaluations_json_str:
+        try:
+            evaluations = orjson.loads(evaluations_json_str)
+        except orjson.JSONDecodeError:
+            print(f"Failed to parse JSON from LLM: {evaluations_json_str}")
+    if not isinstance(evaluations, list):
+        evaluations = []
+
     feedback = {}
-    for index, question in enumerate(questions):
-        user_answer = user_answers.get(str(index), '')
-        prompt = (
-            f"Based on the document, evaluate if this answer: '{user_answer}' "
-            f"is correct for the question: '{question}'. Give a verdict "
-            f"(Correct/Partially Correct/Incorrect) and justify using [Page X, Line Y] or [Line Y] markers.\n\n"
-            f"Document content: {doc_text}"
-        )
-        evaluation = get_gemini_response(prompt)
-        feedback[index] = evaluation or "Evaluation not available."
+    missing = []
+    for index in range(len(questions)):
+        evaluation = evaluations[index] if index < len(evaluations) else None
+        if isinstance(evaluation, dict) and evaluation.get('verdict'):
+            feedback[index] = f"{evaluation['verdict']}\n{evaluation.get('justification', '')}".strip()
+        else:
+            missing.append(index)
+
+    # Evaluate anything the batched call didn't cover one question at a
+    # time. The calls are I/O-bound, so run them concurrently.
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(len(missing), EVALUATION_WORKERS)) as executor:
+            futures = {
+                executor.submit(
+                    evaluate_answer, document, questions[index], qa_pairs[index]['answer']
+                ): index
+                for index in missing
+            }
+            for future in as_completed(futures):
+                feedback[futures[future]] = future.result() or "Evaluation not available."
+        feedback = dict(sorted(feedback.items()))
 
+    if all(value != "Evaluation not available." for value in feedback.values()):
+        store_cached_answer(cache_key, feedback)
     return jsonify({'feedback': feedback}), 200
 
 
-# Run the Flask server if script is executed directly
+# ASGI entry point. Serve with: uvicorn app:asgi_app --port 5000 --workers 4
+# a2wsgi runs each request on its own thread from a pool of ASGI_THREADS,
+# so requests waiting on Gemini (including open /ask streams, which hold
+# their thread until the stream ends) don't block one another. Documents
+# and answers live in the shared on-disk store, so any worker can serve
+# any request.
+asgi_app = WSGIMiddleware(app, workers=ASGI_THREADS)
+
+
+# Run the Flask development server if script is executed directly
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
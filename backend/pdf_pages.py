@@ -0,0 +1,43 @@
+import fitz  # PyMuPDF
+
+# -------------------------------
+# PDF PAGE EXTRACTION
+# -------------------------------
+#
+# Kept apart from app.py so the worker processes that extract large PDFs
+# in parallel only import PyMuPDF, not the Flask app and its clients.
+# -------------------------------
+
+
+def extract_pdf_pages(pdf_path, start, stop):
+    """
+    Extract and annotate a range of pages from a PDF file.
+
+    Opens the PDF itself so it can run in a worker process
+    (PyMuPDF documents can't be pickled).
+
+    Parameters:
+        pdf_path (str): Path to the PDF file.
+        start (int): Index of the first page to extract.
+        stop (int): Index one past the last page to extract.
+
+    Returns:
+        str: The annotated text of the pages.
+    """
+    parts = []
+    with fitz.open(pdf_path) as doc:
+        for page_num in range(start, stop):
+            page_text = doc[page_num].get_text("text")
+            lines = page_text.split('\n')
+            prefix = f"[Page {page_num + 1}, Line "
+            # isspace() detects blank lines without allocating a stripped copy
+            for i, line in enumerate(lines, 1):
+                if line and not line.isspace():
+                    parts.append(prefix)
+                    parts.append(str(i))
+                    parts.append('] ')
+                    parts.append(line)
+                    parts.append('\n')
+                else:
+                    parts.append("\n")
+    return "".join(parts)
@@ -15,6 +15,7 @@ const App = () => {
     const chatContainerRef = useRef(null); // Ref for scrolling chat to bottom
 
     const API_BASE_URL = 'http://127.0.0.1:5000'; // Your Flask backend URL
+    const MAX_STATUS_POLLS = 900; // Stop waiting for an upload after 15 minutes
 
     // Effect to scroll chat to the bottom on new messages
     useEffect(() => {
@@ -23,6 +24,37 @@ const App = () => {
         }
     }, [chatHistory]);
 
+    // Read a Server-Sent Events response, calling onEvent with each parsed payload
+    const readEventStream = async (response, onEvent) => {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const events = buffer.split('\n\n');
+            buffer = events.pop();
+            for (const event of events) {
+                if (event.startsWith('data: ')) {
+                    onEvent(JSON.parse(event.slice(6)));
+                }
+            }
+        }
+    };
+
+    // Poll the backend until background processing of an upload finishes,
+    // giving up after MAX_STATUS_POLLS seconds
+    const waitForDocument = async (uploadId) => {
+        for (let attempt = 0; attempt < MAX_STATUS_POLLS; attempt++) {
+            const response = await fetch(`${API_BASE_URL}/status/${uploadId}`);
+            const data = await response.json();
+            if (data.status !== 'pending') return data;
+            await new Promise((resolve) => setTimeout(resolve, 1000));
+        }
+        return { status: 'error', error: 'Timed out waiting for the document to be processed.' };
+    };
+
     // Function to handle file selection
     const handleFileChange = (event) => {
         setSelectedFile(event.target.files[0]); // Corrected: get the first file
@@ -55,9 +87,16 @@ const App = () => {
             const data = await response.json();
 
             if (response.ok) {
-                setSummary(data.summary);
-                setMessage('Document uploaded and summarized successfully!');
-                setChatHistory([]); // Corrected: clear chat history after new upload
+                // Extraction and summarization run in the background; wait for them
+                // unless the backend already has this exact file's summary
+                const result = data.status === 'done' ? data : await waitForDocument(data.id);
+                if (result.status === 'done') {
+                    setSummary(result.summary);
+                    setMessage('Document uploaded and summarized successfully!');
+                    setChatHistory([]); // Corrected: clear chat history after new upload
+                } else {
+                    setMessage(`Error: ${result.error || 'Failed to process document.'}`);
+                }
             } else {
                 setMessage(`Error: ${data.error || 'Failed to upload document.'}`); // Corrected syntax
                 console.error('Upload error:', data);
@@ -88,15 +127,26 @@ const App = () => {
         try {
             const response = await fetch(`${API_BASE_URL}/ask`, {
                 method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
+                headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
                 body: JSON.stringify({ query: newUserMessage.text, documentName: selectedFile.name }),
             });
-            const data = await response.json();
 
             if (response.ok) {
-                setChatHistory((prev) => [...prev, { role: 'assistant', text: data.answer }]);
+                // Append an empty assistant message and grow it as chunks arrive
+                setChatHistory((prev) => [...prev, { role: 'assistant', text: '' }]);
                 setMessage('');
+                await readEventStream(response, (event) => {
+                    if (event.text) {
+                        setChatHistory((prev) => {
+                            const last = prev[prev.length - 1];
+                            return [...prev.slice(0, -1), { ...last, text: last.text + event.text }];
+                        });
+                    } else if (event.error) {
+                        setMessage(`Error: ${event.error}`);
+                    }
+                });
             } else {
+                const data = await response.json();
                 setMessage(`Error: ${data.error || 'Failed to get an answer.'}`); // Corrected syntax
                 console.error('Ask error:', data);
             }